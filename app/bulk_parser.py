@@ -0,0 +1,68 @@
+import csv
+import json
+
+
+MAX_LINE_LENGTH = 4096
+
+
+async def iter_lines(stream):
+    # split a byte stream into lines without reading the whole body into memory,
+    # records are short, so too long line is an error
+    tail = b''
+    async for chunk in stream:
+        lines = chunk.split(b'\n')
+        if len(lines) == 1:
+            tail += chunk
+        else:
+            lines[0] = tail + lines[0]
+            tail = lines.pop()
+            for line in lines:
+                if len(line) > MAX_LINE_LENGTH:
+                    raise ValueError(f'Line is longer than {MAX_LINE_LENGTH} bytes')
+                yield line.decode('utf-8').rstrip('\r')
+        if len(tail) > MAX_LINE_LENGTH:
+            raise ValueError(f'Line is longer than {MAX_LINE_LENGTH} bytes')
+    if tail:
+        yield tail.decode('utf-8').rstrip('\r')
+
+
+async def parse_ndjson(stream):
+    async for line in iter_lines(stream):
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        if 'record_name' not in item:
+            raise ValueError(f'Missing record_name in line: {line}')
+        yield item['record_name']
+
+
+async def parse_csv(stream):
+    # first line is a header, it must contain the record_name column
+    # input is read line by line, so quoted fields with new lines are not supported
+    column = None
+    async for line in iter_lines(stream):
+        if not line.strip():
+            continue
+        try:
+            row = next(csv.reader([line], strict=True))
+        except csv.Error as err:
+            raise ValueError(f'Wrong CSV line, quoted fields with new lines are not supported: {line}') from err
+        if column is None:
+            if 'record_name' not in row:
+                raise ValueError('CSV header must contain record_name column')
+            column = row.index('record_name')
+            continue
+        yield row[column]
+
+
+PARSERS = {
+    'text/csv': parse_csv,
+    'application/x-ndjson': parse_ndjson,
+    'application/ndjson': parse_ndjson,
+}
+
+
+def get_parser(content_type: str):
+    # returns None for not supported content type
+    media_type = content_type.split(';')[0].strip().lower()
+    return PARSERS.get(media_type)
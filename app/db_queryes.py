@@ -1,12 +1,16 @@
-from models import MoveRecord
+import time
+from models import MoveRecord, BulkInsert
 from logger import logger
 
+SORT_STEP = 1000
+BULK_CHUNK_SIZE = 10000
+
 
 async def get_records(conn, limit: int, offset: int):
     rows = []
     try:
         rows = await conn.fetch(
-            'SELECT id, sort_order, record_name FROM records ORDER BY sort_order LIMIT $1 OFFSET $2', limit, offset
+            'SELECT id, sort_order, record_name FROM records ORDER BY sort_order, id LIMIT $1 OFFSET $2', limit, offset
         )
     except Exception as ex:
         logger.error(f'While get records raise is error: {ex}')
@@ -14,6 +18,19 @@ async def get_records(conn, limit: int, offset: int):
     return [dict(row) for row in rows]
 
 
+async def get_record_rank(conn, record_id: int):
+    # rank is zero based position of record, it can be used as offset for get_records
+    record = await conn.fetchrow('SELECT sort_order FROM records WHERE id = $1', record_id)
+    if not record:
+        return None
+
+    rank = await conn.fetchrow(
+        'SELECT COUNT(*) as rank FROM records WHERE sort_order < $1 OR (sort_order = $1 AND id < $2)',
+        record['sort_order'], record_id
+    )
+    return rank['rank']
+
+
 async def move_record(conn, move_record: MoveRecord):
     record = await conn.fetchrow('SELECT id, sort_order, record_name FROM records WHERE id = $1', move_record.record_id)
     if not record:
@@ -40,23 +57,23 @@ async def move_record(conn, move_record: MoveRecord):
     
     # for all other cases
     else:
-        before_order = None
-        after_order = None
-        if move_record.before_id:
+        before_row = await conn.fetchrow('SELECT sort_order FROM records WHERE id = $1', move_record.before_id)
+        after_row = await conn.fetchrow('SELECT sort_order FROM records WHERE id = $1', move_record.after_id)
+        if before_row is None or after_row is None:
+            raise ValueError('Record for before_id or after_id not found')
+        before_order = before_row['sort_order']
+        after_order = after_row['sort_order']
+
+        # no room between records, so spread them and read new orders
+        if abs(after_order - before_order) <= 1:
+            await reindex_range(conn, min(after_order, before_order), max(after_order, before_order))
             before_row = await conn.fetchrow('SELECT sort_order FROM records WHERE id = $1', move_record.before_id)
-            before_order = before_row['sort_order']
-        if move_record.after_id:
             after_row = await conn.fetchrow('SELECT sort_order FROM records WHERE id = $1', move_record.after_id)
+            before_order = before_row['sort_order']
             after_order = after_row['sort_order']
-        
-        if before_order and after_order:
-            new_order = (after_order + before_order) // 2
-            
-        if after_order is not None and abs(after_order - before_order) <= 1:
-            reindex_range(conn, after_order, before_order)
-            new_order = move_record(conn, move_record)['sort_order']
-       
-   
+
+        new_order = (after_order + before_order) // 2
+
     await conn.execute('UPDATE records SET sort_order = $1 WHERE id = $2', new_order, move_record.record_id)
     logger.info(f'Updated sort_order for record_id: {move_record.record_id} to {new_order}')
        
@@ -66,14 +83,110 @@ async def move_record(conn, move_record: MoveRecord):
 
 
 async def reindex_range(conn, from_sort: int, to_sort: int):
-    rows = await conn.fetch('''
-        SELECT id FROM records
-        WHERE sort_order BETWEEN $1 AND $2
-        ORDER BY sort_order
-        LIMIT 1000
-    ''', from_sort, to_sort)
+    # contract is described in RecordRepository.reindex_range
+    rows = await conn.fetch(
+        'SELECT id FROM records WHERE sort_order BETWEEN $1 AND $2 ORDER BY sort_order, id', from_sort, to_sort
+    )
+    if not rows:
+        return 0
+
+    lower = await conn.fetchrow(
+        'SELECT sort_order FROM records WHERE sort_order < $1 ORDER BY sort_order DESC LIMIT 1', from_sort
+    )
+    upper = await conn.fetchrow(
+        'SELECT sort_order FROM records WHERE sort_order > $1 ORDER BY sort_order LIMIT 1', to_sort
+    )
+    lower_order = lower['sort_order'] if lower else from_sort - SORT_STEP * len(rows)
+    upper_order = upper['sort_order'] if upper else to_sort + SORT_STEP * len(rows)
+    step = (upper_order - lower_order) // (len(rows) + 1)
+
+    if step < 2:
+        shift = SORT_STEP * (len(rows) + 1) - (upper_order - lower_order)
+        await conn.execute('UPDATE records SET sort_order = sort_order + $1 WHERE sort_order >= $2', shift, upper_order)
+        step = SORT_STEP
 
     for index, row in enumerate(rows):
-        new_order = (((index + 1) * 1000) + 1)
+        new_order = lower_order + step * (index + 1)
         await conn.execute('UPDATE records SET sort_order = $1 WHERE id = $2', new_order, row['id'])
-        logger.info(f'Reindexed records from {from_sort} to {to_sort}, was update is {len(rows)} rows')
+    logger.info(f'Reindexed records from {from_sort} to {to_sort}, was update is {len(rows)} rows')
+
+    return len(rows)
+
+
+async def get_bulk_bounds(conn, bulk_insert: BulkInsert):
+    # for case append at the tail
+    if bulk_insert.after_id is None and bulk_insert.before_id is None:
+        max_order = await conn.fetchrow('SELECT MAX(sort_order) as max_order FROM records')
+        start_order = 0
+        if max_order and max_order['max_order'] is not None:
+            start_order = max_order['max_order']
+        return start_order + SORT_STEP, SORT_STEP
+
+    # for case insert block between two records
+    if bulk_insert.after_id is None or bulk_insert.before_id is None:
+        raise ValueError('Both after_id and before_id are required to insert between records')
+    if not bulk_insert.count or bulk_insert.count < 1:
+        raise ValueError('count is required to insert between records')
+
+    after_row = await conn.fetchrow('SELECT sort_order FROM records WHERE id = $1', bulk_insert.after_id)
+    before_row = await conn.fetchrow('SELECT sort_order FROM records WHERE id = $1', bulk_insert.before_id)
+    if not after_row or not before_row:
+        raise ValueError('Record for after_id or before_id not found')
+
+    # records are ordered by (sort_order, id), after_id must come before before_id
+    low_order, low_id = after_row['sort_order'], bulk_insert.after_id
+    high_order, high_id = before_row['sort_order'], bulk_insert.before_id
+    if (low_order, low_id) >= (high_order, high_id):
+        raise ValueError('Record for after_id must come before record for before_id')
+
+    # block must go between neighbours, otherwise it will be mixed with rows in the middle
+    between_row = await conn.fetchrow(
+        'SELECT id FROM records WHERE (sort_order, id) > ($1, $2) AND (sort_order, id) < ($3, $4) LIMIT 1',
+        low_order, low_id, high_order, high_id
+    )
+    if between_row:
+        raise ValueError('Records for after_id and before_id are not neighbours')
+
+    step = (high_order - low_order) // (bulk_insert.count + 1)
+    if step < 1:
+        # make room for block by shift of all records from before_id
+        shift = SORT_STEP * (bulk_insert.count + 1) - (high_order - low_order)
+        await conn.execute(
+            'UPDATE records SET sort_order = sort_order + $1 WHERE (sort_order, id) >= ($2, $3)',
+            shift, high_order, high_id
+        )
+        logger.info(f'Shifted sort_order from {high_order} by {shift} for bulk insert of {bulk_insert.count} rows')
+        step = SORT_STEP
+
+    return low_order + step, step
+
+
+async def bulk_insert_records(conn, rows, bulk_insert: BulkInsert, chunk_size: int = BULK_CHUNK_SIZE):
+    start_time = time.perf_counter()
+    total = 0
+
+    async with conn.transaction():
+        # bounds are computed from current rows, concurrent writers must wait for commit
+        await conn.execute('LOCK TABLE records IN SHARE ROW EXCLUSIVE MODE')
+        next_order, step = await get_bulk_bounds(conn, bulk_insert)
+
+        chunk = []
+        async for record_name in rows:
+            if bulk_insert.count is not None and total + len(chunk) >= bulk_insert.count:
+                raise ValueError(f'Got more rows than count={bulk_insert.count}')
+            chunk.append((next_order, record_name))
+            next_order += step
+            if len(chunk) >= chunk_size:
+                await conn.copy_records_to_table('records', records=chunk, columns=['sort_order', 'record_name'])
+                total += len(chunk)
+                chunk = []
+
+        if chunk:
+            await conn.copy_records_to_table('records', records=chunk, columns=['sort_order', 'record_name'])
+            total += len(chunk)
+
+    elapsed = time.perf_counter() - start_time
+    rows_per_sec = total / elapsed if elapsed > 0 else 0
+    logger.info(f'Bulk inserted {total} rows in {elapsed:.2f}s ({rows_per_sec:.0f} rows/sec)')
+
+    return {'rows': total, 'elapsed': round(elapsed, 3), 'rows_per_sec': round(rows_per_sec)}
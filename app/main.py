@@ -1,14 +1,24 @@
 import logging
-from fastapi import FastAPI, HTTPException, Request
-from db_main import get_conn
-from db_queryes import get_records, move_record
-from models import MoveRecord
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Depends
+from models import MoveRecord, BulkInsert
+from bulk_parser import get_parser
+from repository import RecordRepository, get_repository, open_repository, close_repository
 from logger import logger
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_repository()
+    yield
+    close_repository()
+
+
+app = FastAPI(lifespan = lifespan)
  
 @app.get('/records')
-async def read_records(request: Request, limit: int = 100, offset: int = 0):
+async def read_records(request: Request, limit: int = 100, offset: int = 0,
+                       repository: RecordRepository = Depends(get_repository)):
     
     logger.info(f'GET /records - limit={limit}, offset={offset}',
                 extra = {
@@ -17,8 +27,7 @@ async def read_records(request: Request, limit: int = 100, offset: int = 0):
                 })
     
     try:
-        conn = await get_conn()
-        records = await get_records(conn, limit, offset)
+        records = await repository.get_records(limit, offset)
         return records
     except Exception as e:
         logger.exception('Failed to fetch records', 
@@ -27,12 +36,9 @@ async def read_records(request: Request, limit: int = 100, offset: int = 0):
                             'method': request.method  
                          })
         raise HTTPException(status_code=500, detail='Error fetching records')
-    finally:
-        if conn:
-            await conn.close()        
 
 @app.post('/records/move')
-async def move(request: Request):
+async def move(request: Request, repository: RecordRepository = Depends(get_repository)):
     data = await request.json()
     logger.info(f'GET /records - data {data}',
                 extra = {
@@ -41,8 +47,7 @@ async def move(request: Request):
                 })
     try:
         record = MoveRecord(**data)
-        conn = await get_conn()
-        result = await move_record(conn, record)
+        result = await repository.move_record(record)
         return result
         
     except Exception as err:
@@ -52,7 +57,32 @@ async def move(request: Request):
                             'method': request.method  
                          })
         raise HTTPException(status_code = 400, detail = (str(err)))
-        
-        
-        
-        
\ No newline at end of file
+
+
+@app.post('/records/bulk')
+async def bulk(request: Request, after_id: int = None, before_id: int = None, count: int = None,
+               repository: RecordRepository = Depends(get_repository)):
+    content_type = request.headers.get('content-type', '')
+    logger.info(f'POST /records/bulk - content_type={content_type}, after_id={after_id}, before_id={before_id}, count={count}',
+                extra = {
+                 'client_ip': request.client.host,
+                 'method': request.method
+                })
+    parser = get_parser(content_type)
+    if parser is None:
+        raise HTTPException(status_code = 415, detail = f'Unsupported content type: {content_type}')
+
+    try:
+        bulk_insert = BulkInsert(after_id = after_id, before_id = before_id, count = count)
+        rows = parser(request.stream())
+        result = await repository.bulk_insert_records(rows, bulk_insert)
+        return result
+
+    except Exception as err:
+        logger.exception('Failed to bulk insert records',
+                         extra = {
+                            'client_ip': request.client.host,
+                            'method': request.method
+                         })
+        raise HTTPException(status_code = 400, detail = (str(err)))
+
@@ -0,0 +1,441 @@
+import os
+import random
+import struct
+import sys
+from array import array
+from models import MoveRecord, BulkInsert
+
+SORT_STEP = 1000
+MAX_LEVEL = 32
+MAX_NAME_LENGTH = 128
+
+SNAPSHOT_MAGIC = b'GSKY'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sHQ')
+
+
+def check_record_name(record_name: str):
+    # same limit as record_name varchar(128) in records table
+    if len(record_name) > MAX_NAME_LENGTH:
+        raise ValueError(f'record_name is longer than {MAX_NAME_LENGTH} characters')
+
+
+class _Node():
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next = [None] * level
+        # width[level] - how many positions the link on this level jumps over
+        self.width = [1] * level
+
+
+class IndexedSkipList():
+    # skip list with link widths, gives O(log n) insert, remove, rank and select by index
+    def __init__(self):
+        self.head = _Node(None, MAX_LEVEL)
+        self.size = 0
+        # highest level in use, levels above it are not linked
+        self.level = 1
+
+    def __len__(self):
+        return self.size
+
+    def _random_level(self):
+        level = 1
+        while level < MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, key):
+        new_level = self._random_level()
+        if new_level > self.level:
+            for level in range(self.level, new_level):
+                self.head.next[level] = None
+                self.head.width[level] = self.size + 1
+            self.level = new_level
+
+        chain = [None] * self.level
+        steps_at_level = [0] * self.level
+        node = self.head
+        for level in reversed(range(self.level)):
+            while node.next[level] is not None and node.next[level].key < key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        new_node = _Node(key, new_level)
+        steps = 0
+        for level in range(new_level):
+            prev = chain[level]
+            new_node.next[level] = prev.next[level]
+            prev.next[level] = new_node
+            new_node.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(new_level, self.level):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain = [None] * self.level
+        node = self.head
+        for level in reversed(range(self.level)):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), self.level):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def rank(self, key):
+        # count of keys less than key
+        position = 0
+        node = self.head
+        for level in reversed(range(self.level)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def _node_at(self, index: int):
+        if index < 0 or index >= self.size:
+            return None
+        position = 0
+        target = index + 1
+        node = self.head
+        for level in reversed(range(self.level)):
+            while node.next[level] is not None and position + node.width[level] <= target:
+                position += node.width[level]
+                node = node.next[level]
+        return node
+
+    def iter_from(self, index: int):
+        node = self._node_at(index)
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+    def update_from(self, index: int, update, count: int = None):
+        # replace keys in place from index, update must keep the order of keys
+        # generator yields new keys, it must be consumed to apply all updates
+        node = self._node_at(index)
+        while node is not None and (count is None or count > 0):
+            node.key = update(node.key)
+            yield node.key
+            node = node.next[0]
+            if count is not None:
+                count -= 1
+
+    def iter_range(self, from_key, to_key):
+        # keys in [from_key, to_key]
+        for key in self.iter_from(self.rank(from_key)):
+            if key > to_key:
+                break
+            yield key
+
+    def predecessor(self, key):
+        index = self.rank(key)
+        if index == 0:
+            return None
+        return next(self.iter_from(index - 1))
+
+    def successor(self, key):
+        # first key greater than key
+        for item in self.iter_from(self.rank(key)):
+            if item > key:
+                return item
+        return None
+
+    def first(self):
+        node = self.head.next[0]
+        return node.key if node else None
+
+    def last(self):
+        node = self.head
+        for level in reversed(range(self.level)):
+            while node.next[level] is not None:
+                node = node.next[level]
+        return node.key if node is not self.head else None
+
+    def extend_sorted(self, keys):
+        # fast build for keys which are sorted and greater than all existing keys
+        tails = [self.head] * MAX_LEVEL
+        tail_positions = [0] * MAX_LEVEL
+        node = self.head
+        position = 0
+        for level in reversed(range(self.level)):
+            while node.next[level] is not None:
+                position += node.width[level]
+                node = node.next[level]
+            tails[level] = node
+            tail_positions[level] = position
+
+        last_key = node.key if node is not self.head else None
+        for key in keys:
+            if last_key is not None and key <= last_key:
+                raise ValueError(f'Keys must be sorted, got {key} after {last_key}')
+            last_key = key
+            position = self.size + 1
+            new_level = self._random_level()
+            if new_level > self.level:
+                for level in range(self.level, new_level):
+                    self.head.next[level] = None
+                self.level = new_level
+            new_node = _Node(key, new_level)
+            for level in range(new_level):
+                tails[level].next[level] = new_node
+                tails[level].width[level] = position - tail_positions[level]
+                tails[level] = new_node
+                tail_positions[level] = position
+            self.size += 1
+
+        # links from tails go to the end of list
+        for level in range(self.level):
+            tails[level].width[level] = self.size + 1 - tail_positions[level]
+
+
+class MemoryEngine():
+    # records are kept in skip list by key (sort_order, id), like ORDER BY sort_order, id
+    def __init__(self):
+        self.index = IndexedSkipList()
+        self.records = {}
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self.records)
+
+    def _row(self, record_id: int):
+        sort_order, record_name = self.records[record_id]
+        return {'id': record_id, 'sort_order': sort_order, 'record_name': record_name}
+
+    def _set_order(self, record_id: int, new_order: int):
+        sort_order, record_name = self.records[record_id]
+        self.index.remove((sort_order, record_id))
+        self.index.insert((new_order, record_id))
+        self.records[record_id] = (new_order, record_name)
+
+    def _update_orders(self, index: int, new_order, count: int = None):
+        # new_order(sort_order) must keep the order of records, so keys are updated in place
+        for sort_order, record_id in self.index.update_from(index, lambda key: (new_order(key[0]), key[1]), count):
+            self.records[record_id] = (sort_order, self.records[record_id][1])
+
+    def insert_record(self, record_id: int, sort_order: int, record_name: str):
+        if record_id in self.records:
+            raise ValueError(f'Record with id {record_id} already exists')
+        check_record_name(record_name)
+        self.index.insert((sort_order, record_id))
+        self.records[record_id] = (sort_order, record_name)
+        self.next_id = max(self.next_id, record_id + 1)
+
+    def _bulk_bounds(self, bulk_insert: BulkInsert):
+        # same rules as db_queryes.get_bulk_bounds
+        if bulk_insert.after_id is None and bulk_insert.before_id is None:
+            last = self.index.last()
+            start_order = last[0] if last else 0
+            return start_order + SORT_STEP, SORT_STEP
+
+        if bulk_insert.after_id is None or bulk_insert.before_id is None:
+            raise ValueError('Both after_id and before_id are required to insert between records')
+        if not bulk_insert.count or bulk_insert.count < 1:
+            raise ValueError('count is required to insert between records')
+        if bulk_insert.after_id not in self.records or bulk_insert.before_id not in self.records:
+            raise ValueError('Record for after_id or before_id not found')
+
+        low_key = (self.records[bulk_insert.after_id][0], bulk_insert.after_id)
+        high_key = (self.records[bulk_insert.before_id][0], bulk_insert.before_id)
+        if low_key >= high_key:
+            raise ValueError('Record for after_id must come before record for before_id')
+        high_rank = self.index.rank(high_key)
+        if high_rank - self.index.rank(low_key) != 1:
+            raise ValueError('Records for after_id and before_id are not neighbours')
+
+        low_order, high_order = low_key[0], high_key[0]
+        step = (high_order - low_order) // (bulk_insert.count + 1)
+        if step < 1:
+            # make room for block by shift of all records from high_order
+            shift = SORT_STEP * (bulk_insert.count + 1) - (high_order - low_order)
+            self._update_orders(high_rank, lambda sort_order: sort_order + shift)
+            step = SORT_STEP
+
+        return low_order + step, step
+
+    def bulk_insert(self, record_names: list, bulk_insert: BulkInsert):
+        # all rows are checked before insert, so on error the engine is not changed
+        if bulk_insert.count is not None and len(record_names) > bulk_insert.count:
+            raise ValueError(f'Got more rows than count={bulk_insert.count}')
+        for record_name in record_names:
+            check_record_name(record_name)
+
+        next_order, step = self._bulk_bounds(bulk_insert)
+        keys = []
+        for record_name in record_names:
+            record_id = self.next_id
+            self.next_id += 1
+            self.records[record_id] = (next_order, record_name)
+            keys.append((next_order, record_id))
+            next_order += step
+
+        if bulk_insert.after_id is None:
+            self.index.extend_sorted(keys)
+        else:
+            for key in keys:
+                self.index.insert(key)
+        return len(keys)
+
+    def get_records(self, limit: int, offset: int):
+        rows = []
+        for sort_order, record_id in self.index.iter_from(offset):
+            if len(rows) >= limit:
+                break
+            rows.append(self._row(record_id))
+        return rows
+
+    def get_record_rank(self, record_id: int):
+        if record_id not in self.records:
+            return None
+        sort_order, _ = self.records[record_id]
+        return self.index.rank((sort_order, record_id))
+
+    def move_record(self, move_record: MoveRecord):
+        if move_record.record_id not in self.records:
+            return None
+
+        # for case if not elements before
+        if move_record.before_id is None:
+            first = self.index.first()
+            new_order = first[0] - SORT_STEP
+
+        # for case if not elements after
+        elif move_record.after_id is None:
+            last = self.index.last()
+            new_order = last[0] + SORT_STEP
+
+        # for all other cases
+        else:
+            if move_record.before_id not in self.records or move_record.after_id not in self.records:
+                raise ValueError('Record for before_id or after_id not found')
+            before_order = self.records[move_record.before_id][0]
+            after_order = self.records[move_record.after_id][0]
+
+            if abs(after_order - before_order) <= 1:
+                self.reindex_range(min(after_order, before_order), max(after_order, before_order))
+                before_order = self.records[move_record.before_id][0]
+                after_order = self.records[move_record.after_id][0]
+
+            new_order = (after_order + before_order) // 2
+
+        self._set_order(move_record.record_id, new_order)
+        return self._row(move_record.record_id)
+
+    def reindex_range(self, from_sort: int, to_sort: int):
+        # contract is described in RecordRepository.reindex_range
+        keys = list(self.index.iter_range((from_sort, -sys.maxsize), (to_sort, sys.maxsize)))
+        if not keys:
+            return 0
+
+        first_rank = self.index.rank(keys[0])
+        lower = self.index.predecessor(keys[0])
+        upper = self.index.successor(keys[-1])
+        lower_order = lower[0] if lower else from_sort - SORT_STEP * len(keys)
+        upper_order = upper[0] if upper else to_sort + SORT_STEP * len(keys)
+        step = (upper_order - lower_order) // (len(keys) + 1)
+
+        if step < 2:
+            shift = SORT_STEP * (len(keys) + 1) - (upper_order - lower_order)
+            self._update_orders(first_rank + len(keys), lambda sort_order: sort_order + shift)
+            upper_order += shift
+            step = SORT_STEP
+
+        new_orders = iter(range(lower_order + step, upper_order, step))
+        self._update_orders(first_rank, lambda sort_order: next(new_orders), len(keys))
+        return len(keys)
+
+    def dump(self, path: str):
+        # snapshot layout: header, ids, sort orders, name lengths, names blob
+        ids = array('q')
+        sort_orders = array('q')
+        name_lengths = array('H')
+        names = bytearray()
+        for sort_order, record_id in self.index.iter_from(0):
+            name = self.records[record_id][1].encode('utf-8')
+            ids.append(record_id)
+            sort_orders.append(sort_order)
+            name_lengths.append(len(name))
+            names += name
+
+        if sys.byteorder != 'little':
+            ids.byteswap()
+            sort_orders.byteswap()
+            name_lengths.byteswap()
+
+        # write to temporary file first, so crash while writing does not break the old snapshot
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(ids)))
+                f.write(ids.tobytes())
+                f.write(sort_orders.tobytes())
+                f.write(name_lengths.tobytes())
+                f.write(names)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        if len(data) < SNAPSHOT_HEADER.size:
+            raise ValueError(f'Snapshot file {path} is too short')
+        magic, version, count = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f'Unsupported snapshot file {path}')
+        if len(data) < SNAPSHOT_HEADER.size + 18 * count:
+            raise ValueError(f'Snapshot file {path} is truncated')
+
+        offset = SNAPSHOT_HEADER.size
+        ids = array('q')
+        ids.frombytes(data[offset:offset + 8 * count])
+        offset += 8 * count
+        sort_orders = array('q')
+        sort_orders.frombytes(data[offset:offset + 8 * count])
+        offset += 8 * count
+        name_lengths = array('H')
+        name_lengths.frombytes(data[offset:offset + 2 * count])
+        offset += 2 * count
+
+        if sys.byteorder != 'little':
+            ids.byteswap()
+            sort_orders.byteswap()
+            name_lengths.byteswap()
+
+        expected_size = SNAPSHOT_HEADER.size + 18 * count + sum(name_lengths)
+        if len(data) != expected_size:
+            raise ValueError(f'Snapshot file {path} has size {len(data)}, expected {expected_size}')
+
+        engine = cls()
+        keys = []
+        for record_id, sort_order, name_length in zip(ids, sort_orders, name_lengths):
+            if record_id in engine.records:
+                raise ValueError(f'Snapshot file {path} has duplicate record id {record_id}')
+            engine.records[record_id] = (sort_order, data[offset:offset + name_length].decode('utf-8'))
+            keys.append((sort_order, record_id))
+            offset += name_length
+        engine.index.extend_sorted(keys)
+        if engine.records:
+            engine.next_id = max(engine.records) + 1
+        return engine
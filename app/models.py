@@ -3,3 +3,10 @@ class MoveRecord():
       self.record_id = record_id
       self.before_id = before_id
       self.after_id = after_id
+
+
+class BulkInsert():
+    def __init__(self, after_id: int = None, before_id: int = None, count: int = None):
+      self.after_id = after_id
+      self.before_id = before_id
+      self.count = count
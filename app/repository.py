@@ -0,0 +1,142 @@
+import os
+import time
+from abc import ABC, abstractmethod
+import db_queryes
+from db_main import get_conn
+from memory_engine import MemoryEngine, check_record_name
+from models import MoveRecord, BulkInsert
+from logger import logger
+
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'postgres')
+MEMORY_SNAPSHOT = os.getenv('MEMORY_SNAPSHOT')
+STORAGE_BACKENDS = ('postgres', 'memory')
+
+
+class RecordRepository(ABC):
+    # records are ordered by sort_order, records with same sort_order are ordered by id
+    @abstractmethod
+    async def get_records(self, limit: int, offset: int):
+        pass
+
+    # returns updated record, or None if record_id is not found
+    @abstractmethod
+    async def move_record(self, move_record: MoveRecord):
+        pass
+
+    # renumbers records with sort_order in [from_sort, to_sort] keeping their order,
+    # new values are spread evenly between the nearest records outside of the range.
+    # If there is not enough room, records after the range are shifted.
+    # Returns count of renumbered records.
+    @abstractmethod
+    async def reindex_range(self, from_sort: int, to_sort: int):
+        pass
+
+    # returns zero based position of record, it can be used as offset for get_records
+    @abstractmethod
+    async def get_record_rank(self, record_id: int):
+        pass
+
+    # inserts record names from async iterator, returns rows, elapsed and rows_per_sec
+    @abstractmethod
+    async def bulk_insert_records(self, rows, bulk_insert: BulkInsert):
+        pass
+
+
+class PostgresRepository(RecordRepository):
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def get_records(self, limit: int, offset: int):
+        return await db_queryes.get_records(self.conn, limit, offset)
+
+    async def move_record(self, move_record: MoveRecord):
+        return await db_queryes.move_record(self.conn, move_record)
+
+    async def reindex_range(self, from_sort: int, to_sort: int):
+        return await db_queryes.reindex_range(self.conn, from_sort, to_sort)
+
+    async def get_record_rank(self, record_id: int):
+        return await db_queryes.get_record_rank(self.conn, record_id)
+
+    async def bulk_insert_records(self, rows, bulk_insert: BulkInsert):
+        return await db_queryes.bulk_insert_records(self.conn, rows, bulk_insert)
+
+
+class MemoryRepository(RecordRepository):
+    def __init__(self, engine: MemoryEngine = None):
+        self.engine = engine or MemoryEngine()
+
+    @classmethod
+    def from_snapshot(cls, path: str):
+        return cls(MemoryEngine.load(path))
+
+    def dump(self, path: str):
+        self.engine.dump(path)
+
+    async def get_records(self, limit: int, offset: int):
+        return self.engine.get_records(limit, offset)
+
+    async def move_record(self, move_record: MoveRecord):
+        return self.engine.move_record(move_record)
+
+    async def reindex_range(self, from_sort: int, to_sort: int):
+        return self.engine.reindex_range(from_sort, to_sort)
+
+    async def get_record_rank(self, record_id: int):
+        return self.engine.get_record_rank(record_id)
+
+    async def bulk_insert_records(self, rows, bulk_insert: BulkInsert):
+        start_time = time.perf_counter()
+        # rows are collected before insert, so the engine is not changed on error in the body
+        record_names = []
+        async for record_name in rows:
+            if bulk_insert.count is not None and len(record_names) >= bulk_insert.count:
+                raise ValueError(f'Got more rows than count={bulk_insert.count}')
+            check_record_name(record_name)
+            record_names.append(record_name)
+        total = self.engine.bulk_insert(record_names, bulk_insert)
+
+        elapsed = time.perf_counter() - start_time
+        rows_per_sec = total / elapsed if elapsed > 0 else 0
+        logger.info(f'Bulk inserted {total} rows in {elapsed:.2f}s ({rows_per_sec:.0f} rows/sec)')
+
+        return {'rows': total, 'elapsed': round(elapsed, 3), 'rows_per_sec': round(rows_per_sec)}
+
+
+memory_repository = None
+
+
+def open_repository():
+    # called on startup, so wrong settings or broken snapshot stop the service
+    global memory_repository
+    if STORAGE_BACKEND not in STORAGE_BACKENDS:
+        raise ValueError(f'Unknown STORAGE_BACKEND {STORAGE_BACKEND}, expected one of {STORAGE_BACKENDS}')
+    if STORAGE_BACKEND != 'memory':
+        return
+
+    if MEMORY_SNAPSHOT and os.path.exists(MEMORY_SNAPSHOT):
+        memory_repository = MemoryRepository.from_snapshot(MEMORY_SNAPSHOT)
+        logger.info(f'Loaded {len(memory_repository.engine)} records from snapshot {MEMORY_SNAPSHOT}')
+    else:
+        memory_repository = MemoryRepository()
+
+
+async def get_repository():
+    if STORAGE_BACKEND == 'memory':
+        if memory_repository is None:
+            raise RuntimeError('Memory repository is not opened')
+        yield memory_repository
+        return
+
+    conn = await get_conn()
+    try:
+        yield PostgresRepository(conn)
+    finally:
+        await conn.close()
+
+
+def close_repository():
+    # memory records are saved to snapshot on shutdown
+    if memory_repository is not None and MEMORY_SNAPSHOT:
+        memory_repository.dump(MEMORY_SNAPSHOT)
+        logger.info(f'Saved {len(memory_repository.engine)} records to snapshot {MEMORY_SNAPSHOT}')
@@ -0,0 +1,78 @@
+import pytest
+from app.bulk_parser import MAX_LINE_LENGTH, get_parser, parse_csv, parse_ndjson
+
+
+async def fake_stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_parse_ndjson():
+    body = b'{"record_name": "Record 1"}\n\n{"record_name": "Record 2"}\r\n{"record_name": "Record 3"}'
+
+    result = await collect(parse_ndjson(fake_stream([body])))
+
+    assert result == ['Record 1', 'Record 2', 'Record 3']
+
+
+@pytest.mark.asyncio
+async def test_parse_ndjson_split_chunks():
+    body = '{"record_name": "Запись 1"}\n{"record_name": "Запись 2"}\n'.encode('utf-8')
+    # split inside of the multi byte character
+    split_at = body.index('З'.encode('utf-8')) + 1
+    chunks = [body[:split_at], body[split_at:split_at + 3], body[split_at + 3:]]
+
+    result = await collect(parse_ndjson(fake_stream(chunks)))
+
+    assert result == ['Запись 1', 'Запись 2']
+
+
+@pytest.mark.asyncio
+async def test_parse_ndjson_missing_record_name():
+    with pytest.raises(ValueError):
+        await collect(parse_ndjson(fake_stream([b'{"name": "Record 1"}\n'])))
+
+
+@pytest.mark.asyncio
+async def test_parse_ndjson_too_long_line():
+    # body without new line must be rejected before it is read to the end
+    chunks = [b'{"record_name": "' + b'x' * 1024 for _ in range(10)]
+
+    with pytest.raises(ValueError):
+        await collect(parse_ndjson(fake_stream(chunks)))
+
+    with pytest.raises(ValueError):
+        await collect(parse_ndjson(fake_stream([b'x' * (MAX_LINE_LENGTH + 1) + b'\n'])))
+
+
+@pytest.mark.asyncio
+async def test_parse_csv():
+    chunks = [b'id,record_na', b'me\n1,Record 1\n2,"Record, 2"\n', b'3,Record 3']
+
+    result = await collect(parse_csv(fake_stream(chunks)))
+
+    assert result == ['Record 1', 'Record, 2', 'Record 3']
+
+
+@pytest.mark.asyncio
+async def test_parse_csv_missing_header():
+    with pytest.raises(ValueError):
+        await collect(parse_csv(fake_stream([b'name\nRecord 1\n'])))
+
+
+@pytest.mark.asyncio
+async def test_parse_csv_quoted_new_line():
+    with pytest.raises(ValueError):
+        await collect(parse_csv(fake_stream([b'record_name\n"Record\n1"\n'])))
+
+
+def test_get_parser():
+    assert get_parser('text/csv; charset=utf-8') is parse_csv
+    assert get_parser('application/x-ndjson') is parse_ndjson
+    assert get_parser('application/json') is None
+    assert get_parser('') is None
@@ -2,8 +2,8 @@ import pytest
 import asyncio
 from unittest.mock import MagicMock, AsyncMock
 from typing import List, Dict, Any, Optional
-from app.models import MoveRecord
-from app.db_queryes import get_records, move_record, reindex_range
+from app.models import MoveRecord, BulkInsert
+from app.db_queryes import get_records, get_record_rank, move_record, reindex_range, bulk_insert_records
 
 class Record(dict):
     def __getitem__(self, key):
@@ -19,9 +19,11 @@ class MockConnection:
         self.fetch = AsyncMock()
         self.fetchrow = AsyncMock()
         self.execute = AsyncMock()
+        self.copy_records_to_table = AsyncMock()
         self._setup_fetch_mocks()
         self._setup_fetchrow_mocks()
         self._setup_execute_mock()
+        self._setup_copy_mock()
     
     def _setup_fetch_mocks(self):
         async def mock_fetch(query, *args, **kwargs):
@@ -64,13 +66,32 @@ class MockConnection:
                     if record['id'] == record_id:
                         return Record({'sort_order': record['sort_order']})
                 return None
+            elif 'SELECT COUNT(*) as rank FROM records' in query:
+                sort_order = args[0]
+                record_id = args[1]
+                rank = sum(1 for r in self.data if (r['sort_order'], r['id']) < (sort_order, record_id))
+                return Record({'rank': rank})
+            elif 'SELECT id FROM records WHERE (sort_order, id) >' in query:
+                low_key = (args[0], args[1])
+                high_key = (args[2], args[3])
+                for record in self.data:
+                    if low_key < (record['sort_order'], record['id']) < high_key:
+                        return Record({'id': record['id']})
+                return None
             return None
             
         self.fetchrow.side_effect = mock_fetchrow
     
     def _setup_execute_mock(self):
         async def mock_execute(query, *args, **kwargs):
-            if 'UPDATE records SET sort_order' in query:
+            if 'SET sort_order = sort_order +' in query:
+                shift = args[0]
+                # shift from key (sort_order, id) or from sort_order
+                from_key = tuple(args[1:]) if len(args) > 2 else (args[1], float('-inf'))
+                for record in self.data:
+                    if (record['sort_order'], record['id']) >= from_key:
+                        record['sort_order'] += shift
+            elif 'UPDATE records SET sort_order' in query:
                 new_order = args[0]
                 record_id = args[1]
                 for record in self.data:
@@ -80,6 +101,21 @@ class MockConnection:
             return None
             
         self.execute.side_effect = mock_execute
+
+    def _setup_copy_mock(self):
+        async def mock_copy(table_name, records, columns, **kwargs):
+            for sort_order, record_name in records:
+                self.data.append({'id': len(self.data) + 1, 'sort_order': sort_order, 'record_name': record_name})
+            return None
+
+        self.copy_records_to_table.side_effect = mock_copy
+
+    def transaction(self):
+        transaction = MagicMock()
+        transaction.__aenter__ = AsyncMock(return_value=transaction)
+        transaction.__aexit__ = AsyncMock(return_value=False)
+        self.last_transaction = transaction
+        return transaction
         
     async def _fetch(self, query, from_sort, to_sort):
         return [row for row in self.data if from_sort <= row['sort_order'] <= to_sort]
@@ -297,3 +333,196 @@ async def test_reindex_range():
     mock_data[2]['sort_order'] == 1001
     mock_data[3]['sort_order'] == 2001
 
+
+async def fake_rows(names):
+    for name in names:
+        yield name
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_records_append():
+    mock_data = [
+        {'id': 1, 'sort_order': 1000, 'record_name': 'Record 1'},
+        {'id': 2, 'sort_order': 2000, 'record_name': 'Record 2'}
+    ]
+    mock_conn = MockConnection(mock_data)
+
+    names = [f'Bulk {i}' for i in range(5)]
+    result = await bulk_insert_records(mock_conn, fake_rows(names), BulkInsert(), chunk_size=2)
+
+    assert result['rows'] == 5
+    # 5 rows by 2 in chunk must be 3 copies
+    assert mock_conn.copy_records_to_table.await_count == 3
+    assert [r['sort_order'] for r in mock_data[2:]] == [3000, 4000, 5000, 6000, 7000]
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_records_between():
+    mock_data = [
+        {'id': 1, 'sort_order': 1000, 'record_name': 'Record 1'},
+        {'id': 2, 'sort_order': 2000, 'record_name': 'Record 2'}
+    ]
+    mock_conn = MockConnection(mock_data)
+
+    bulk_req = BulkInsert(after_id=1, before_id=2, count=3)
+    result = await bulk_insert_records(mock_conn, fake_rows(['A', 'B', 'C']), bulk_req)
+
+    assert result['rows'] == 3
+    assert [r['sort_order'] for r in mock_data[2:]] == [1250, 1500, 1750]
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_records_between_shift():
+    mock_data = [
+        {'id': 1, 'sort_order': 1000, 'record_name': 'Record 1'},
+        {'id': 2, 'sort_order': 1002, 'record_name': 'Record 2'},
+        {'id': 3, 'sort_order': 2000, 'record_name': 'Record 3'}
+    ]
+    mock_conn = MockConnection(mock_data)
+
+    bulk_req = BulkInsert(after_id=1, before_id=2, count=3)
+    result = await bulk_insert_records(mock_conn, fake_rows(['A', 'B', 'C']), bulk_req)
+
+    assert result['rows'] == 3
+    # records from before_id are shifted to make room for block
+    assert mock_data[1]['sort_order'] == 5000
+    assert mock_data[2]['sort_order'] == 5998
+    assert [r['sort_order'] for r in mock_data[3:]] == [2000, 3000, 4000]
+    queries = [call[0][0] for call in mock_conn.execute.call_args_list]
+    assert 'LOCK TABLE records IN SHARE ROW EXCLUSIVE MODE' in queries[0]
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_records_between_not_neighbours():
+    mock_data = [
+        {'id': 1, 'sort_order': 1000, 'record_name': 'Record 1'},
+        {'id': 2, 'sort_order': 2000, 'record_name': 'Record 2'},
+        {'id': 3, 'sort_order': 3000, 'record_name': 'Record 3'}
+    ]
+    mock_conn = MockConnection(mock_data)
+
+    bulk_req = BulkInsert(after_id=1, before_id=3, count=2)
+    with pytest.raises(ValueError):
+        await bulk_insert_records(mock_conn, fake_rows(['A', 'B']), bulk_req)
+
+    mock_conn.copy_records_to_table.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_records_more_than_count():
+    mock_data = [
+        {'id': 1, 'sort_order': 1000, 'record_name': 'Record 1'},
+        {'id': 2, 'sort_order': 2000, 'record_name': 'Record 2'}
+    ]
+    mock_conn = MockConnection(mock_data)
+
+    bulk_req = BulkInsert(after_id=1, before_id=2, count=2)
+    with pytest.raises(ValueError):
+        await bulk_insert_records(mock_conn, fake_rows(['A', 'B', 'C']), bulk_req)
+
+    mock_conn.copy_records_to_table.assert_not_awaited()
+    # transaction must be exited with error, so it will be rolled back
+    exc_type = mock_conn.last_transaction.__aexit__.call_args[0][0]
+    assert exc_type is ValueError
+
+
+@pytest.mark.asyncio
+async def test_get_record_rank():
+    mock_data = [
+        {'id': 1, 'sort_order': 1000, 'record_name': 'Record 1'},
+        {'id': 2, 'sort_order': 2000, 'record_name': 'Record 2'},
+        {'id': 3, 'sort_order': 2000, 'record_name': 'Record 3'}
+    ]
+    mock_conn = MockConnection(mock_data)
+
+    assert await get_record_rank(mock_conn, 1) == 0
+    # same sort_order, order by id
+    assert await get_record_rank(mock_conn, 3) == 2
+    assert await get_record_rank(mock_conn, 999) is None
+
+
+@pytest.mark.asyncio
+async def test_reindex_range_shift():
+    mock_data = [
+        {'id': 1, 'sort_order': 1000, 'record_name': 'Record 1'},
+        {'id': 2, 'sort_order': 1001, 'record_name': 'Record 2'},
+        {'id': 3, 'sort_order': 1002, 'record_name': 'Record 3'},
+        {'id': 4, 'sort_order': 1003, 'record_name': 'Record 4'}
+    ]
+    mock_conn = MockConnection(mock_data)
+
+    async def mock_fetchrow(query, *args, **kwargs):
+        if 'sort_order < $1' in query:
+            return Record({'sort_order': 1000})
+        if 'sort_order > $1' in query:
+            return Record({'sort_order': 1003})
+        return None
+
+    mock_conn.fetchrow.side_effect = mock_fetchrow
+
+    result = await reindex_range(mock_conn, from_sort=1001, to_sort=1002)
+
+    assert result == 2
+    assert [r['sort_order'] for r in mock_data] == [1000, 2000, 3000, 4000]
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_records_between_same_sort_order():
+    mock_data = [
+        {'id': 1, 'sort_order': 1000, 'record_name': 'Record 1'},
+        {'id': 2, 'sort_order': 1000, 'record_name': 'Record 2'},
+        {'id': 3, 'sort_order': 3000, 'record_name': 'Record 3'}
+    ]
+    mock_conn = MockConnection(mock_data)
+
+    bulk_req = BulkInsert(after_id=1, before_id=2, count=2)
+    result = await bulk_insert_records(mock_conn, fake_rows(['A', 'B']), bulk_req)
+
+    assert result['rows'] == 2
+    # after_id is not moved, before_id and records after it are shifted
+    assert [r['sort_order'] for r in mock_data] == [1000, 4000, 6000, 2000, 3000]
+
+
+@pytest.mark.asyncio
+async def test_bulk_insert_records_between_wrong_order():
+    mock_data = [
+        {'id': 1, 'sort_order': 1000, 'record_name': 'Record 1'},
+        {'id': 2, 'sort_order': 2000, 'record_name': 'Record 2'}
+    ]
+    mock_conn = MockConnection(mock_data)
+
+    bulk_req = BulkInsert(after_id=2, before_id=1, count=1)
+    with pytest.raises(ValueError):
+        await bulk_insert_records(mock_conn, fake_rows(['A']), bulk_req)
+
+    mock_conn.copy_records_to_table.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_move_record_between_adjacent_records():
+    mock_data = [
+        {'id': 1, 'sort_order': 1000, 'record_name': 'Record 1'},
+        {'id': 2, 'sort_order': 1001, 'record_name': 'Record 2'},
+        {'id': 3, 'sort_order': 3000, 'record_name': 'Record 3'}
+    ]
+    mock_conn = MockConnection(mock_data)
+
+    original_fetchrow = mock_conn.fetchrow.side_effect
+
+    async def modified_fetchrow(query, *args, **kwargs):
+        if 'SELECT id, sort_order, record_name FROM records WHERE id' in query and args[0] == 3:
+            for record in mock_conn.data:
+                if record['id'] == 3:
+                    return [3, record['sort_order'], 'Record 3']
+        return await original_fetchrow(query, *args, **kwargs)
+
+    mock_conn.fetchrow.side_effect = modified_fetchrow
+
+    move_req = MoveRecord(record_id=3, before_id=2, after_id=1)
+    result = await move_record(mock_conn, move_req)
+
+    # records 1 and 2 are spread, record 3 is placed between them
+    sort_orders = {r['id']: r['sort_order'] for r in mock_data}
+    assert sort_orders[1] < result['sort_order'] < sort_orders[2]
+    assert result['id'] == 3
+
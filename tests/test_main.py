@@ -1,7 +1,8 @@
 import pytest
 from httpx import AsyncClient, ASGITransport
-from app.main import app
-from app.db_main import get_conn
+from app.main import app, get_repository
+from app.memory_engine import MemoryEngine
+from app.repository import MemoryRepository
 
 # fake data
 fake_records = [
@@ -14,15 +15,20 @@ fake_records = [
 fake_move_result = {'status': 'success', 'moved_id': 1}
 
 
+@pytest.fixture
+def mock_repository(mocker):
+    repository = mocker.AsyncMock()
+    app.dependency_overrides[get_repository] = lambda: repository
+    yield repository
+    app.dependency_overrides.clear()
+
+
 @pytest.mark.asyncio
-async def test_read_records(mocker):
+async def test_read_records(mock_repository):
     # Мокаем зависимости
-    mock_conn = mocker.AsyncMock()
-    mock_conn.close = mocker.AsyncMock()
-    mocker.patch('app.main.get_conn', return_value=mock_conn)
-    mocker.patch('app.main.get_records', return_value=[
+    mock_repository.get_records.return_value = [
        fake_records[0]
-    ])
+    ]
 
     transport = ASGITransport(app=app, raise_app_exceptions=True)
 
@@ -34,10 +40,8 @@ async def test_read_records(mocker):
 
 
 @pytest.mark.asyncio
-async def test_move_record(mocker):
-    mock_conn = mocker.AsyncMock()
-    mocker.patch('app.main.get_conn', return_value=mock_conn)
-    mocker.patch('app.main.move_record', return_value={'status': 'ok'})
+async def test_move_record(mock_repository):
+    mock_repository.move_record.return_value = {'status': 'ok'}
 
     payload = {
         'record_id': 2,
@@ -51,4 +55,72 @@ async def test_move_record(mocker):
         response = await client.post('/records/move', json = payload)
 
     assert response.status_code == 200
-    assert response.json() == {'status': 'ok'}
\ No newline at end of file
+    assert response.json() == {'status': 'ok'}
+
+
+async def fake_bulk_insert(rows, bulk_insert):
+    names = [name async for name in rows]
+    return {'rows': len(names), 'elapsed': 0.1, 'rows_per_sec': len(names) * 10}
+
+
+@pytest.mark.asyncio
+async def test_bulk_records(mock_repository):
+    mock_repository.bulk_insert_records.side_effect = fake_bulk_insert
+
+    body = 'record_name\nRecord 1\nRecord 2\nRecord 3\n'
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+
+    async with AsyncClient(transport=transport, base_url='http://test') as client:
+        response = await client.post('/records/bulk', content = body, headers = {'Content-Type': 'text/csv'})
+
+    assert response.status_code == 200
+    assert response.json()['rows'] == 3
+
+
+@pytest.mark.asyncio
+async def test_bulk_records_ndjson(mock_repository):
+    mock_repository.bulk_insert_records.side_effect = fake_bulk_insert
+
+    body = '{"record_name": "Record 1"}\n{"record_name": "Record 2"}\n'
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+
+    async with AsyncClient(transport=transport, base_url='http://test') as client:
+        response = await client.post('/records/bulk', content = body, headers = {'Content-Type': 'application/x-ndjson'})
+
+    assert response.status_code == 200
+    assert response.json()['rows'] == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_records_unsupported_content_type(mock_repository):
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+
+    async with AsyncClient(transport=transport, base_url='http://test') as client:
+        response = await client.post('/records/bulk', json = [{'record_name': 'Record 1'}])
+
+    assert response.status_code == 415
+    mock_repository.bulk_insert_records.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_memory_backend():
+    repository = MemoryRepository(MemoryEngine())
+    app.dependency_overrides[get_repository] = lambda: repository
+
+    transport = ASGITransport(app=app, raise_app_exceptions=True)
+
+    async with AsyncClient(transport=transport, base_url='http://test') as client:
+        response = await client.post('/records/bulk', content = 'record_name\nRecord 1\nRecord 2\nRecord 3\n',
+                                     headers = {'Content-Type': 'text/csv'})
+        assert response.json()['rows'] == 3
+
+        response = await client.post('/records/move', json = {'record_id': 3, 'before_id': None, 'after_id': 1})
+        assert response.json() == {'id': 3, 'sort_order': 0, 'record_name': 'Record 3'}
+
+        response = await client.get('/records?limit=3&offset=0')
+
+    app.dependency_overrides.clear()
+
+    assert [r['id'] for r in response.json()] == [3, 1, 2]
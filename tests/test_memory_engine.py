@@ -0,0 +1,334 @@
+import pytest
+import random
+import os
+from app.models import MoveRecord, BulkInsert
+from app.memory_engine import IndexedSkipList, MemoryEngine
+import app.repository as repository_module
+from app.repository import RecordRepository, MemoryRepository, PostgresRepository
+from test_database import MockConnection
+
+
+def make_engine(count: int = 5):
+    engine = MemoryEngine()
+    for i in range(1, count + 1):
+        engine.insert_record(i, i * 1000, f'Record {i}')
+    return engine
+
+
+def test_skip_list_rank_and_select():
+    skip_list = IndexedSkipList()
+    keys = random.sample(range(100000), 1000)
+    for key in keys:
+        skip_list.insert(key)
+
+    expected = sorted(keys)
+    for key in expected[::50]:
+        skip_list.remove(key)
+    expected = [key for index, key in enumerate(expected) if index % 50 != 0]
+
+    assert len(skip_list) == len(expected)
+    assert list(skip_list.iter_from(0)) == expected
+    assert list(skip_list.iter_from(100))[:10] == expected[100:110]
+    for key in expected[::37]:
+        assert skip_list.rank(key) == expected.index(key)
+
+
+def test_skip_list_extend_sorted():
+    skip_list = IndexedSkipList()
+    skip_list.extend_sorted(range(0, 1000, 10))
+    skip_list.insert(5)
+
+    assert skip_list.rank(10) == 2
+    assert skip_list.last() == 990
+
+    with pytest.raises(ValueError):
+        skip_list.extend_sorted([1])
+
+
+def test_get_records():
+    engine = make_engine()
+
+    result = engine.get_records(limit=3, offset=1)
+
+    assert [r['id'] for r in result] == [2, 3, 4]
+    assert engine.get_records(limit=10, offset=10) == []
+
+
+def test_move_record_wrong_input():
+    engine = make_engine()
+
+    assert engine.move_record(MoveRecord(record_id=999)) is None
+
+
+def test_move_record_to_top_and_bottom():
+    engine = make_engine(3)
+
+    result = engine.move_record(MoveRecord(record_id=3, before_id=None, after_id=1))
+    assert result['sort_order'] == 0
+    assert engine.get_record_rank(3) == 0
+
+    result = engine.move_record(MoveRecord(record_id=3, before_id=2, after_id=None))
+    assert result['sort_order'] == 3000
+    assert engine.get_record_rank(3) == 2
+
+
+def test_move_record_between_records():
+    engine = make_engine()
+
+    result = engine.move_record(MoveRecord(record_id=4, before_id=2, after_id=1))
+
+    assert result['sort_order'] == 1500
+    assert [r['id'] for r in engine.get_records(limit=5, offset=0)] == [1, 4, 2, 3, 5]
+
+
+def test_move_record_reindex_when_no_gap():
+    engine = MemoryEngine()
+    engine.insert_record(1, 1000, 'Record 1')
+    engine.insert_record(2, 1001, 'Record 2')
+    engine.insert_record(3, 2000, 'Record 3')
+
+    engine.move_record(MoveRecord(record_id=3, before_id=2, after_id=1))
+
+    assert [r['id'] for r in engine.get_records(limit=3, offset=0)] == [1, 3, 2]
+    orders = [r['sort_order'] for r in engine.get_records(limit=3, offset=0)]
+    assert orders == sorted(set(orders))
+
+
+def test_reindex_range():
+    engine = MemoryEngine()
+    engine.insert_record(1, 1000, 'Record 1')
+    engine.insert_record(2, 1001, 'Record 2')
+    engine.insert_record(3, 1002, 'Record 3')
+    engine.insert_record(4, 2000, 'Record 4')
+
+    assert engine.reindex_range(1001, 1003) == 2
+
+    assert [r['sort_order'] for r in engine.get_records(limit=4, offset=0)] == [1000, 1333, 1666, 2000]
+
+
+def test_snapshot_dump_and_load(tmp_path):
+    engine = make_engine(100)
+    engine.insert_record(101, 1500, 'Запись 101')
+    path = str(tmp_path / 'records.snapshot')
+
+    engine.dump(path)
+    loaded = MemoryEngine.load(path)
+
+    assert len(loaded) == 101
+    assert loaded.get_records(limit=200, offset=0) == engine.get_records(limit=200, offset=0)
+    assert loaded.get_record_rank(101) == 1
+
+
+def test_snapshot_truncated(tmp_path):
+    engine = make_engine(10)
+    path = tmp_path / 'records.snapshot'
+    engine.dump(str(path))
+    data = path.read_bytes()
+
+    # cut inside of names and inside of sort orders
+    for size in (len(data) - 30, 14 + 8 * 10 + 4):
+        path.write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            MemoryEngine.load(str(path))
+
+
+def test_snapshot_duplicate_ids(tmp_path):
+    engine = make_engine(2)
+    path = tmp_path / 'records.snapshot'
+    engine.dump(str(path))
+    data = bytearray(path.read_bytes())
+    # second id is set to first id
+    data[14 + 8:14 + 16] = data[14:14 + 8]
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError):
+        MemoryEngine.load(str(path))
+
+
+def test_snapshot_dump_replaces_file(tmp_path):
+    path = tmp_path / 'records.snapshot'
+    make_engine(3).dump(str(path))
+    make_engine(5).dump(str(path))
+
+    assert len(MemoryEngine.load(str(path))) == 5
+    assert os.listdir(tmp_path) == ['records.snapshot']
+
+
+def test_insert_record_long_name():
+    engine = MemoryEngine()
+
+    with pytest.raises(ValueError):
+        engine.insert_record(1, 1000, 'x' * 129)
+
+
+def test_bulk_insert_append():
+    engine = make_engine(2)
+
+    assert engine.bulk_insert(['A', 'B'], BulkInsert()) == 2
+
+    assert engine.get_records(limit=4, offset=0)[2:] == [
+        {'id': 3, 'sort_order': 3000, 'record_name': 'A'},
+        {'id': 4, 'sort_order': 4000, 'record_name': 'B'}
+    ]
+
+
+def test_bulk_insert_between():
+    engine = make_engine(3)
+
+    engine.bulk_insert(['A', 'B', 'C'], BulkInsert(after_id=1, before_id=2, count=3))
+
+    assert [r['sort_order'] for r in engine.get_records(limit=6, offset=0)] == [1000, 1250, 1500, 1750, 2000, 3000]
+
+
+def test_bulk_insert_between_shift():
+    engine = MemoryEngine()
+    engine.insert_record(1, 1000, 'Record 1')
+    engine.insert_record(2, 1001, 'Record 2')
+    engine.insert_record(3, 2000, 'Record 3')
+
+    engine.bulk_insert(['A', 'B', 'C'], BulkInsert(after_id=1, before_id=2, count=3))
+
+    result = engine.get_records(limit=6, offset=0)
+    assert [r['id'] for r in result] == [1, 4, 5, 6, 2, 3]
+    assert [r['sort_order'] for r in result] == [1000, 2000, 3000, 4000, 5000, 5999]
+
+
+def test_bulk_insert_wrong_input():
+    engine = make_engine(3)
+
+    with pytest.raises(ValueError):
+        engine.bulk_insert(['A'], BulkInsert(after_id=1, before_id=3, count=1))
+    with pytest.raises(ValueError):
+        engine.bulk_insert(['A', 'B'], BulkInsert(after_id=1, before_id=2, count=1))
+    # after_id must come before before_id
+    with pytest.raises(ValueError):
+        engine.bulk_insert(['A'], BulkInsert(after_id=2, before_id=1, count=1))
+
+    assert len(engine) == 3
+
+
+def test_bulk_insert_between_same_sort_order():
+    engine = MemoryEngine()
+    engine.insert_record(1, 1000, 'Record 1')
+    engine.insert_record(2, 1000, 'Record 2')
+    engine.insert_record(3, 3000, 'Record 3')
+
+    engine.bulk_insert(['A', 'B'], BulkInsert(after_id=1, before_id=2, count=2))
+
+    result = engine.get_records(limit=5, offset=0)
+    assert [r['id'] for r in result] == [1, 4, 5, 2, 3]
+    assert [r['sort_order'] for r in result] == [1000, 2000, 3000, 4000, 6000]
+
+
+def test_reindex_range_shift():
+    engine = MemoryEngine()
+    for i in range(1, 5):
+        engine.insert_record(i, 999 + i, f'Record {i}')
+
+    assert engine.reindex_range(1001, 1002) == 2
+
+    assert [r['sort_order'] for r in engine.get_records(limit=4, offset=0)] == [1000, 2000, 3000, 4000]
+
+
+def test_repository_is_abstract():
+    with pytest.raises(TypeError):
+        RecordRepository()
+
+
+def test_snapshot_wrong_file(tmp_path):
+    path = tmp_path / 'wrong.snapshot'
+    path.write_bytes(b'x' * 64)
+
+    with pytest.raises(ValueError):
+        MemoryEngine.load(str(path))
+
+
+@pytest.mark.asyncio
+async def test_memory_repository():
+    repository = MemoryRepository(make_engine())
+
+    result = await repository.move_record(MoveRecord(record_id=5, before_id=None, after_id=1))
+
+    assert result['sort_order'] == 0
+    assert await repository.get_record_rank(5) == 0
+    assert (await repository.get_records(limit=1, offset=0))[0]['id'] == 5
+
+
+@pytest.mark.asyncio
+async def test_postgres_repository():
+    mock_data = [
+        {'id': 1, 'sort_order': 1000, 'record_name': 'Record 1'},
+        {'id': 2, 'sort_order': 2000, 'record_name': 'Record 2'}
+    ]
+    mock_conn = MockConnection(mock_data)
+    repository = PostgresRepository(mock_conn)
+
+    result = await repository.get_records(limit=10, offset=0)
+
+    assert [r['id'] for r in result] == [1, 2]
+    mock_conn.fetch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_bulk_insert():
+    repository = MemoryRepository()
+
+    async def rows():
+        for i in range(5):
+            yield f'Record {i}'
+
+    result = await repository.bulk_insert_records(rows(), BulkInsert())
+
+    assert result['rows'] == 5
+    assert await repository.get_record_rank(5) == 4
+
+
+@pytest.mark.asyncio
+async def test_memory_repository_bulk_insert_more_than_count():
+    repository = MemoryRepository(make_engine(2))
+    read_rows = []
+
+    async def rows():
+        for i in range(100):
+            read_rows.append(i)
+            yield f'Record {i}'
+
+    with pytest.raises(ValueError):
+        await repository.bulk_insert_records(rows(), BulkInsert(count=3))
+
+    # reading stops right after count is exceeded
+    assert len(read_rows) == 4
+    assert len(repository.engine) == 2
+
+
+def test_open_repository_unknown_backend(monkeypatch):
+    monkeypatch.setattr(repository_module, 'STORAGE_BACKEND', 'mysql')
+
+    with pytest.raises(ValueError):
+        repository_module.open_repository()
+
+
+def test_open_repository_broken_snapshot(monkeypatch, tmp_path):
+    path = tmp_path / 'records.snapshot'
+    make_engine(10).dump(str(path))
+    path.write_bytes(path.read_bytes()[:-5])
+    monkeypatch.setattr(repository_module, 'STORAGE_BACKEND', 'memory')
+    monkeypatch.setattr(repository_module, 'MEMORY_SNAPSHOT', str(path))
+    monkeypatch.setattr(repository_module, 'memory_repository', None)
+
+    with pytest.raises(ValueError):
+        repository_module.open_repository()
+
+
+@pytest.mark.asyncio
+async def test_open_repository_snapshot(monkeypatch, tmp_path):
+    path = tmp_path / 'records.snapshot'
+    make_engine(10).dump(str(path))
+    monkeypatch.setattr(repository_module, 'STORAGE_BACKEND', 'memory')
+    monkeypatch.setattr(repository_module, 'MEMORY_SNAPSHOT', str(path))
+    monkeypatch.setattr(repository_module, 'memory_repository', None)
+
+    repository_module.open_repository()
+
+    assert len(repository_module.memory_repository.engine) == 10
+